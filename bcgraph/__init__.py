@@ -5,12 +5,13 @@ Project:            bcgraph
 File Description:
 
 """
-from . import dgl, pyg, faker, utils
+from . import dgl, pyg, faker, serving, utils
 
 __all__ = [
     'dgl',
     'pyg',
     'faker',
+    'serving',
     'utils',
 ]
 
@@ -13,7 +13,8 @@ from rdkit import RDLogger
 from rdkit.Chem import Mol, Conformer
 from dgl import DGLGraph
 
-from bcgraph.utils import RDKitFeature, convert_mol_to_generic_graph
+from bcgraph.utils import RDKitFeature, ConformerValidator, \
+    convert_mol_to_generic_graph
 
 
 # suppress RDKit warnings and errors
@@ -29,6 +30,7 @@ def convert_mol_to_graph(
         bond_rdkit_features: Sequence[RDKitFeature],
         one_hot_encoding: bool = True,
         master_node: bool = True,
+        conformer_validator: Optional[ConformerValidator] = None,
 ) -> DGLGraph:
 
     _graph_dict: Dict[str, torch.Tensor] = convert_mol_to_generic_graph(
@@ -38,26 +40,33 @@ def convert_mol_to_graph(
         bond_rdkit_features=bond_rdkit_features,
         one_hot_encoding=one_hot_encoding,
         master_node=master_node,
+        conformer_validator=conformer_validator,
     )
 
+    return convert_generic_graph_to_graph(_graph_dict)
+
+
+def convert_generic_graph_to_graph(
+        generic_graph: Dict[str, torch.Tensor],
+) -> DGLGraph:
+
     dgl_graph = DGLGraph()
     dgl_graph.add_nodes(
-        num=len(_graph_dict['node_attr']),
+        num=len(generic_graph['node_attr']),
     )
-    dgl_graph.nodes.data['attr'] = _graph_dict['node_attr']
-    dgl_graph.nodes.data['pos'] = _graph_dict['node_pos']
+    dgl_graph.ndata['attr'] = generic_graph['node_attr']
+    dgl_graph.ndata['pos'] = generic_graph['node_pos']
 
-    # all DGL graphs are directional, so need to add edges twice
+    # all DGL graphs are directional, so each edge is followed by its
+    # reverse (same as the batched graphs from generate_mol_graphs)
     # ref: https://docs.dgl.ai/api/python/graph.html
+    edge_index = generic_graph['edge_index'].transpose(0, -1)
+    edge_index = torch.stack([edge_index, edge_index.flip(0)], dim=2)
+    edge_index = edge_index.view(2, -1)
     dgl_graph.add_edges(
-        _graph_dict['edge_index'][:, 0],
-        _graph_dict['edge_index'][:, 1],
-        _graph_dict['edge_attr'],
-    )
-    dgl_graph.add_edges(
-        _graph_dict['edge_index'][:, 1],
-        _graph_dict['edge_index'][:, 0],
-        _graph_dict['edge_attr'],
+        edge_index[0],
+        edge_index[1],
+        {'attr': generic_graph['edge_attr'].repeat_interleave(2, dim=0)},
     )
 
     return dgl_graph
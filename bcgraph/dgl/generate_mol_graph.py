@@ -0,0 +1,94 @@
+"""
+File Name:          generate_mol_graph.py
+Project:            bcgraph
+
+File Description:
+
+"""
+import logging
+from typing import Optional, Sequence, List, Union
+
+import dgl
+import torch
+from dgl import DGLGraph
+
+from bcgraph.utils import RDKitFeature
+from bcgraph.faker.generate_mol_graph import Sizes, \
+    generate_generic_mol_graph_batch, generate_generic_mol_graphs, \
+    _DEFAULT_NUM_ATOMS, _DEFAULT_NUM_RINGS, _DEFAULT_RING_SIZES, \
+    _DEFAULT_MAX_DEGREE
+from bcgraph.dgl.convert_mol_to_graph import convert_generic_graph_to_graph
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def generate_mol_graphs(
+        num_graphs: int,
+        atom_rdkit_features: Sequence[RDKitFeature],
+        bond_rdkit_features: Sequence[RDKitFeature],
+        one_hot_encoding: bool = True,
+        master_node: bool = True,
+        num_atoms: Sizes = _DEFAULT_NUM_ATOMS,
+        num_rings: Sizes = _DEFAULT_NUM_RINGS,
+        ring_sizes: Sequence[int] = _DEFAULT_RING_SIZES,
+        max_degree: int = _DEFAULT_MAX_DEGREE,
+        positions: bool = False,
+        seed: Optional[int] = None,
+        batched: bool = True,
+) -> Union[DGLGraph, List[DGLGraph]]:
+    """
+    generate random molecule graphs as a single batched DGL graph, or as a
+    list of DGL graphs if batched is set to False, which is much slower
+    because each graph is converted separately
+
+    """
+
+    if not batched:
+        _generic_graphs = generate_generic_mol_graphs(
+            num_graphs=num_graphs,
+            atom_rdkit_features=atom_rdkit_features,
+            bond_rdkit_features=bond_rdkit_features,
+            one_hot_encoding=one_hot_encoding,
+            master_node=master_node,
+            num_atoms=num_atoms,
+            num_rings=num_rings,
+            ring_sizes=ring_sizes,
+            max_degree=max_degree,
+            positions=positions,
+            seed=seed,
+        )
+        return [convert_generic_graph_to_graph(_g) for _g in _generic_graphs]
+
+    _graph_batch = generate_generic_mol_graph_batch(
+        num_graphs=num_graphs,
+        atom_rdkit_features=atom_rdkit_features,
+        bond_rdkit_features=bond_rdkit_features,
+        one_hot_encoding=one_hot_encoding,
+        master_node=master_node,
+        num_atoms=num_atoms,
+        num_rings=num_rings,
+        ring_sizes=ring_sizes,
+        max_degree=max_degree,
+        positions=positions,
+        seed=seed,
+    )
+
+    # all DGL graphs are directional, so each edge is followed by its
+    # reverse, which keeps the edges of each graph contiguous in the batch
+    edge_index = _graph_batch['edge_index'].transpose(0, -1)
+    edge_index = torch.stack([edge_index, edge_index.flip(0)], dim=2)
+    edge_index = edge_index.view(2, -1)
+
+    dgl_graph = dgl.graph(
+        (edge_index[0], edge_index[1]),
+        num_nodes=len(_graph_batch['node_attr']),
+    )
+    dgl_graph.ndata['attr'] = _graph_batch['node_attr']
+    dgl_graph.ndata['pos'] = _graph_batch['node_pos']
+    dgl_graph.edata['attr'] = \
+        _graph_batch['edge_attr'].repeat_interleave(2, dim=0)
+    dgl_graph.set_batch_num_nodes(_graph_batch['num_nodes'])
+    dgl_graph.set_batch_num_edges(2 * _graph_batch['num_edges'])
+
+    return dgl_graph
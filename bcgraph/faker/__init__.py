@@ -7,8 +7,12 @@ File Description:
 """
 from .faker import Faker
 from .get_random_mol import get_random_mol
+from .generate_mol_graph import generate_generic_mol_graph_batch, \
+    generate_generic_mol_graphs
 
 __all__ = [
     'Faker',
     'get_random_mol',
-]
\ No newline at end of file
+    'generate_generic_mol_graph_batch',
+    'generate_generic_mol_graphs',
+]
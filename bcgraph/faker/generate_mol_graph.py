@@ -0,0 +1,324 @@
+"""
+File Name:          generate_mol_graph.py
+Project:            bcgraph
+
+File Description:
+
+    Generate random molecule-like graphs directly as tensors, without
+    parsing any real molecules with RDKit. The generated graphs share the
+    layout of bcgraph.utils.convert_mol_to_generic_graph, so that they can
+    be used in place of real ones for load testing.
+
+"""
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import torch
+from torch.nn.functional import one_hot
+
+from bcgraph.utils import RDKitFeature
+
+
+_LOGGER = logging.getLogger(__name__)
+
+_DEFAULT_NUM_ATOMS = (8, 32)
+_DEFAULT_NUM_RINGS = (0, 3)
+_DEFAULT_RING_SIZES = (5, 6)
+_DEFAULT_MAX_DEGREE = 4
+_DEFAULT_MAX_INT_FEATURE = 8
+# average length of covalent bonds in angstrom
+_DEFAULT_BOND_LENGTH = 1.5
+
+# number of graphs could be sampled from (1) a fixed integer, (2) an
+# inclusive (low, high) range, or (3) a function that takes the number of
+# graphs and a generator, and returns a tensor of sizes
+Sizes = Union[
+    int,
+    Tuple[int, int],
+    Callable[[int, torch.Generator], torch.Tensor],
+]
+
+
+def _sample_sizes(
+        sizes: Sizes,
+        num_graphs: int,
+        generator: torch.Generator,
+) -> torch.LongTensor:
+
+    if callable(sizes):
+        _sizes = torch.as_tensor(
+            sizes(num_graphs, generator), dtype=torch.long)
+    elif isinstance(sizes, int):
+        _sizes = torch.full((num_graphs, ), sizes, dtype=torch.long)
+    else:
+        _low, _high = sizes
+        _sizes = torch.randint(
+            _low, _high + 1, (num_graphs, ), generator=generator)
+
+    assert _sizes.shape == (num_graphs, )
+    return _sizes
+
+
+def _generate_attr(
+        num: int,
+        rdkit_features: Sequence[RDKitFeature],
+        one_hot_encoding: bool,
+        generator: torch.Generator,
+) -> torch.FloatTensor:
+
+    # follow the column layout of convert_mol_to_generic_graph: one column
+    # for numeric/binary features, and one-hot encoding (or the index) for
+    # categorical features
+    _attr = [torch.zeros(size=(num, 0))]
+    _rdkit_feature: RDKitFeature
+    for _rdkit_feature in rdkit_features:
+        _feature_type = _rdkit_feature.returned_dtype
+        if _feature_type is bool:
+            _column = torch.randint(
+                0, 2, (num, 1), generator=generator).float()
+        elif _feature_type is int:
+            _column = torch.randint(
+                0, _DEFAULT_MAX_INT_FEATURE, (num, 1),
+                generator=generator).float()
+        elif _feature_type is float:
+            _column = torch.rand(size=(num, 1), generator=generator)
+        else:
+            _feature_type: tuple
+            _index = torch.randint(
+                0, len(_feature_type), (num, ), generator=generator)
+            _column = one_hot(_index, len(_feature_type)).float() \
+                if one_hot_encoding else _index.float().unsqueeze(1)
+        _attr.append(_column)
+
+    return torch.cat(_attr, dim=1)
+
+
+def generate_generic_mol_graph_batch(
+        num_graphs: int,
+        atom_rdkit_features: Sequence[RDKitFeature],
+        bond_rdkit_features: Sequence[RDKitFeature],
+        one_hot_encoding: bool = True,
+        master_node: bool = True,
+        num_atoms: Sizes = _DEFAULT_NUM_ATOMS,
+        num_rings: Sizes = _DEFAULT_NUM_RINGS,
+        ring_sizes: Sequence[int] = _DEFAULT_RING_SIZES,
+        max_degree: int = _DEFAULT_MAX_DEGREE,
+        positions: bool = False,
+        seed: Optional[int] = None,
+) -> Dict[str, torch.Tensor]:
+    """
+    generate a batch of random molecule-like graphs at once:
+    - each graph is a random spanning tree over its atoms, grown one atom
+      at a time (vectorized over all the graphs in the batch) with no atom
+      exceeding max_degree bonds;
+    - up to num_rings ring closures are added to each graph, by bonding a
+      random atom with its ancestor in the tree, so that the rings are of
+      the sizes in ring_sizes;
+    - node/edge attributes have the same dimensions as the ones from
+      convert_mol_to_generic_graph with the same feature arguments;
+    - node positions are random walks of bond length along the tree if
+      positions is set to True, otherwise all zeros (same as no conformer).
+
+    the generation is reproducible given the seed.
+
+    returns all the graphs in a single flat batch, with the same keys as
+    convert_mol_to_generic_graph, where the node/edge tensors of all the
+    graphs are concatenated (edge indexes are offset by the number of nodes
+    of the previous graphs), plus the numbers of nodes and edges of each
+    graph in 'num_nodes' and 'num_edges'.
+
+    """
+
+    if num_graphs <= 0:
+        _error_msg = f'Cannot generate {num_graphs} molecule graphs.'
+        raise ValueError(_error_msg)
+
+    _generator = torch.Generator()
+    if seed is None:
+        _generator.seed()
+    else:
+        _generator.manual_seed(seed)
+
+    _num_atoms = _sample_sizes(num_atoms, num_graphs, _generator)
+    _max_num_atoms = int(_num_atoms.max())
+    if int(_num_atoms.min()) < 1:
+        _error_msg = f'Cannot generate molecule graphs with no atom.'
+        raise ValueError(_error_msg)
+    if max_degree < 1 or (max_degree < 2 and _max_num_atoms > 2):
+        _error_msg = f'Cannot generate connected molecule graphs of ' \
+                     f'{_max_num_atoms} atoms with maximum degree ' \
+                     f'{max_degree}.'
+        raise ValueError(_error_msg)
+
+    # grow the spanning trees: atom i (if exists) in every graph bonds with
+    # a random previous atom that is still below the degree limit, which
+    # always exists because atom i - 1 has at most one bond at this point
+    _degree = torch.zeros(size=(num_graphs, _max_num_atoms), dtype=torch.long)
+    _parent = torch.full((num_graphs, _max_num_atoms), -1, dtype=torch.long)
+    _node_pos = torch.zeros(size=(num_graphs, _max_num_atoms + 1, 3))
+    for _i in range(1, _max_num_atoms):
+        _rows = (_num_atoms > _i).nonzero().squeeze(1)
+        _weights = (_degree[_rows, :_i] < max_degree).float()
+        _p = torch.multinomial(
+            _weights, 1, generator=_generator).squeeze(1)
+        _parent[_rows, _i] = _p
+        _degree[_rows, _p] += 1
+        _degree[_rows, _i] += 1
+
+        if positions:
+            _direction = torch.randn(
+                size=(len(_rows), 3), generator=_generator)
+            _direction /= _direction.norm(dim=1, keepdim=True)
+            _node_pos[_rows, _i] = \
+                _node_pos[_rows, _p] + _DEFAULT_BOND_LENGTH * _direction
+
+    # close the rings: bond a random atom to its (ring_size - 1)-th ancestor
+    # if both of them are below the degree limit and not bonded yet
+    _num_rings = _sample_sizes(num_rings, num_graphs, _generator)
+    _max_num_rings = max(int(_num_rings.max()), 0)
+    if _max_num_rings > 0 and (not ring_sizes or min(ring_sizes) < 3):
+        _error_msg = f'Cannot generate rings of sizes {ring_sizes}.'
+        raise ValueError(_error_msg)
+    _ring_sizes = torch.LongTensor(list(ring_sizes))
+    _ring_edge_index = torch.full(
+        (num_graphs, _max_num_rings, 2), -1, dtype=torch.long)
+    for _r in range(_max_num_rings):
+        _rows = (_num_rings > _r).nonzero().squeeze(1)
+        _u = (torch.rand(len(_rows), generator=_generator)
+              * _num_atoms[_rows]).long()
+        _ring_size = _ring_sizes[torch.randint(
+            0, len(_ring_sizes), (len(_rows), ), generator=_generator)]
+
+        _v = _u.clone()
+        for _k in range(int(_ring_sizes.max()) - 1):
+            _step = _k < _ring_size - 1
+            _v = torch.where(
+                _step & (_v >= 0), _parent[_rows, _v.clamp(min=0)], _v)
+
+        _valid = (_v >= 0)
+        _v = _v.clamp(min=0)
+        _valid &= (_degree[_rows, _u] < max_degree)
+        _valid &= (_degree[_rows, _v] < max_degree)
+        _edge_index = torch.stack([torch.min(_u, _v), torch.max(_u, _v)], 1)
+        _valid &= ~(_ring_edge_index[_rows, :_r] ==
+                    _edge_index.unsqueeze(1)).all(dim=2).any(dim=1)
+
+        _rows, _u, _v = _rows[_valid], _u[_valid], _v[_valid]
+        _ring_edge_index[_rows, _r] = _edge_index[_valid]
+        _degree[_rows, _u] += 1
+        _degree[_rows, _v] += 1
+
+    # assemble the padded node and edge indexes of all the graphs, with
+    # masks for the ones that actually exist in each graph
+    _node_index = torch.arange(_max_num_atoms + 1).expand(num_graphs, -1)
+    _node_mask = _node_index < _num_atoms.unsqueeze(1)
+    _is_master_node = torch.zeros_like(_node_mask)
+    _tree_edge_index = torch.stack(
+        [_parent, _node_index[:, :_max_num_atoms]], dim=2)
+    _edge_index = [_tree_edge_index, _ring_edge_index]
+    _edge_mask = [_parent >= 0, _ring_edge_index[:, :, 0] >= 0]
+    _is_master_edge = [torch.zeros_like(_m) for _m in _edge_mask]
+
+    if master_node:
+        _is_master_node = _node_index == _num_atoms.unsqueeze(1)
+        _node_mask |= _is_master_node
+        _master_node_index = _num_atoms.view(-1, 1).expand(-1, _max_num_atoms)
+        _edge_index.append(torch.stack(
+            [_node_index[:, :_max_num_atoms], _master_node_index], dim=2))
+        _edge_mask.append(
+            _node_index[:, :_max_num_atoms] < _num_atoms.unsqueeze(1))
+        _is_master_edge.append(_edge_mask[-1].clone())
+
+    _edge_index = torch.cat(_edge_index, dim=1)
+    _edge_mask = torch.cat(_edge_mask, dim=1)
+    _is_master_edge = torch.cat(_is_master_edge, dim=1)
+
+    # flatten all the existing nodes and edges (grouped by graphs) and
+    # generate their attributes/features all at once
+    _is_master_node = _is_master_node[_node_mask]
+    _is_master_edge = _is_master_edge[_edge_mask]
+    node_pos = _node_pos[_node_mask]
+    node_attr = _generate_attr(
+        len(node_pos), atom_rdkit_features, one_hot_encoding, _generator)
+    edge_index = _edge_index[_edge_mask]
+    edge_attr = _generate_attr(
+        len(edge_index), bond_rdkit_features, one_hot_encoding, _generator)
+
+    if master_node:
+        # master node and edges have a indication digit in attributes/
+        # features and zeros everywhere else
+        node_attr = torch.cat(
+            [node_attr, torch.zeros(size=(len(node_attr), 1))], dim=1)
+        node_attr[_is_master_node] = 0.
+        node_attr[_is_master_node, -1] = 1.
+        edge_attr = torch.cat(
+            [edge_attr, torch.zeros(size=(len(edge_attr), 1))], dim=1)
+        edge_attr[_is_master_edge] = 0.
+        edge_attr[_is_master_edge, -1] = 1.
+
+    # offset the edge indexes of each graph by the number of nodes of all
+    # the previous graphs in the batch
+    num_nodes = _node_mask.sum(dim=1)
+    num_edges = _edge_mask.sum(dim=1)
+    _node_offset = torch.cumsum(num_nodes, dim=0) - num_nodes
+    edge_index += _node_offset.repeat_interleave(num_edges).unsqueeze(1)
+
+    return {
+        'node_pos': node_pos,
+        'node_attr': node_attr,
+        'edge_index': edge_index,
+        'edge_attr': edge_attr,
+        'num_nodes': num_nodes,
+        'num_edges': num_edges,
+    }
+
+
+def generate_generic_mol_graphs(
+        num_graphs: int,
+        atom_rdkit_features: Sequence[RDKitFeature],
+        bond_rdkit_features: Sequence[RDKitFeature],
+        one_hot_encoding: bool = True,
+        master_node: bool = True,
+        num_atoms: Sizes = _DEFAULT_NUM_ATOMS,
+        num_rings: Sizes = _DEFAULT_NUM_RINGS,
+        ring_sizes: Sequence[int] = _DEFAULT_RING_SIZES,
+        max_degree: int = _DEFAULT_MAX_DEGREE,
+        positions: bool = False,
+        seed: Optional[int] = None,
+) -> List[Dict[str, torch.Tensor]]:
+
+    _graph_batch = generate_generic_mol_graph_batch(
+        num_graphs=num_graphs,
+        atom_rdkit_features=atom_rdkit_features,
+        bond_rdkit_features=bond_rdkit_features,
+        one_hot_encoding=one_hot_encoding,
+        master_node=master_node,
+        num_atoms=num_atoms,
+        num_rings=num_rings,
+        ring_sizes=ring_sizes,
+        max_degree=max_degree,
+        positions=positions,
+        seed=seed,
+    )
+
+    # clone the tensors of each graph so that they do not share (and keep
+    # alive) the storage of the whole batch
+    _num_nodes = _graph_batch['num_nodes'].tolist()
+    _num_edges = _graph_batch['num_edges'].tolist()
+    _node_offset = torch.cumsum(_graph_batch['num_nodes'], dim=0) - \
+        _graph_batch['num_nodes']
+    return [
+        {
+            'node_pos': _node_pos.clone(),
+            'node_attr': _node_attr.clone(),
+            'edge_index': _edge_index - _offset,
+            'edge_attr': _edge_attr.clone(),
+        }
+        for _node_pos, _node_attr, _edge_index, _edge_attr, _offset in zip(
+            _graph_batch['node_pos'].split(_num_nodes),
+            _graph_batch['node_attr'].split(_num_nodes),
+            _graph_batch['edge_index'].split(_num_edges),
+            _graph_batch['edge_attr'].split(_num_edges),
+            _node_offset.tolist(),
+        )
+    ]
@@ -5,8 +5,12 @@ Project:            bcgraph
 File Description:
 
 """
-from .convert_mol_to_graph import convert_mol_to_graph
+from .convert_mol_to_graph import convert_mol_to_graph, \
+    convert_generic_graph_to_graph
+from .generate_mol_graph import generate_mol_graphs
 
 __all__ = [
-    'convert_mol_to_graph'
-]
\ No newline at end of file
+    'convert_mol_to_graph',
+    'convert_generic_graph_to_graph',
+    'generate_mol_graphs',
+]
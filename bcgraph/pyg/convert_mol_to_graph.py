@@ -12,9 +12,9 @@ import torch
 from rdkit import RDLogger
 from rdkit.Chem import Mol, Conformer
 from torch_geometric.data import Data
-from torch_geometric.utils import to_undirected
 
-from bcgraph.utils import RDKitFeature, convert_mol_to_generic_graph
+from bcgraph.utils import RDKitFeature, ConformerValidator, \
+    convert_mol_to_generic_graph
 
 
 # suppress RDKit warnings and errors
@@ -30,6 +30,7 @@ def convert_mol_to_graph(
         bond_rdkit_features: Sequence[RDKitFeature],
         one_hot_encoding: bool = True,
         master_node: bool = True,
+        conformer_validator: Optional[ConformerValidator] = None,
 ) -> Data:
 
     _graph_dict: Dict[str, torch.Tensor] = convert_mol_to_generic_graph(
@@ -39,15 +40,24 @@ def convert_mol_to_graph(
         bond_rdkit_features=bond_rdkit_features,
         one_hot_encoding=one_hot_encoding,
         master_node=master_node,
+        conformer_validator=conformer_validator,
     )
 
-    # make the edges undirected (symmetric)
-    edge_index = _graph_dict['edge_index'].transpose(0, -1)
-    edge_index = to_undirected(edge_index)
+    return convert_generic_graph_to_graph(_graph_dict)
+
+
+def convert_generic_graph_to_graph(
+        generic_graph: Dict[str, torch.Tensor],
+) -> Data:
+
+    # make the edges undirected (symmetric) by following each edge with its
+    # reverse, so that the edges and their attributes stay aligned
+    edge_index = generic_graph['edge_index'].transpose(0, -1)
+    edge_index = torch.stack([edge_index, edge_index.flip(0)], dim=2)
 
     return Data(
-        x=_graph_dict['node_attr'],
-        edge_index=edge_index,
-        edge_attr=torch.cat(2 * [_graph_dict['edge_attr']]),
-        pos=_graph_dict['node_pos'],
+        x=generic_graph['node_attr'],
+        edge_index=edge_index.view(2, -1),
+        edge_attr=generic_graph['edge_attr'].repeat_interleave(2, dim=0),
+        pos=generic_graph['node_pos'],
     )
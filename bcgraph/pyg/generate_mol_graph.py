@@ -0,0 +1,89 @@
+"""
+File Name:          generate_mol_graph.py
+Project:            bcgraph
+
+File Description:
+
+"""
+import logging
+from typing import Optional, Sequence, List, Union
+
+import torch
+from torch_geometric.data import Data, Batch
+
+from bcgraph.utils import RDKitFeature
+from bcgraph.faker.generate_mol_graph import Sizes, \
+    generate_generic_mol_graph_batch, generate_generic_mol_graphs, \
+    _DEFAULT_NUM_ATOMS, _DEFAULT_NUM_RINGS, _DEFAULT_RING_SIZES, \
+    _DEFAULT_MAX_DEGREE
+from bcgraph.pyg.convert_mol_to_graph import convert_generic_graph_to_graph
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def generate_mol_graphs(
+        num_graphs: int,
+        atom_rdkit_features: Sequence[RDKitFeature],
+        bond_rdkit_features: Sequence[RDKitFeature],
+        one_hot_encoding: bool = True,
+        master_node: bool = True,
+        num_atoms: Sizes = _DEFAULT_NUM_ATOMS,
+        num_rings: Sizes = _DEFAULT_NUM_RINGS,
+        ring_sizes: Sequence[int] = _DEFAULT_RING_SIZES,
+        max_degree: int = _DEFAULT_MAX_DEGREE,
+        positions: bool = False,
+        seed: Optional[int] = None,
+        batched: bool = True,
+) -> Union[Batch, List[Data]]:
+    """
+    generate random molecule graphs as a single PyG batch (with batch and
+    ptr vectors), or as a list of PyG graphs if batched is set to False,
+    which is much slower because each graph is converted separately
+
+    """
+
+    if not batched:
+        _generic_graphs = generate_generic_mol_graphs(
+            num_graphs=num_graphs,
+            atom_rdkit_features=atom_rdkit_features,
+            bond_rdkit_features=bond_rdkit_features,
+            one_hot_encoding=one_hot_encoding,
+            master_node=master_node,
+            num_atoms=num_atoms,
+            num_rings=num_rings,
+            ring_sizes=ring_sizes,
+            max_degree=max_degree,
+            positions=positions,
+            seed=seed,
+        )
+        return [convert_generic_graph_to_graph(_g) for _g in _generic_graphs]
+
+    _graph_batch = generate_generic_mol_graph_batch(
+        num_graphs=num_graphs,
+        atom_rdkit_features=atom_rdkit_features,
+        bond_rdkit_features=bond_rdkit_features,
+        one_hot_encoding=one_hot_encoding,
+        master_node=master_node,
+        num_atoms=num_atoms,
+        num_rings=num_rings,
+        ring_sizes=ring_sizes,
+        max_degree=max_degree,
+        positions=positions,
+        seed=seed,
+    )
+
+    # the edges of each graph are contiguous in the batch, and stay so
+    # after following each edge with its reverse (same as a single graph)
+    _num_nodes = _graph_batch['num_nodes']
+    edge_index = _graph_batch['edge_index'].transpose(0, -1)
+    edge_index = torch.stack([edge_index, edge_index.flip(0)], dim=2)
+
+    return Batch(
+        batch=torch.arange(num_graphs).repeat_interleave(_num_nodes),
+        ptr=torch.cat([_num_nodes.new_zeros(1), _num_nodes.cumsum(dim=0)]),
+        x=_graph_batch['node_attr'],
+        edge_index=edge_index.view(2, -1),
+        edge_attr=_graph_batch['edge_attr'].repeat_interleave(2, dim=0),
+        pos=_graph_batch['node_pos'],
+    )
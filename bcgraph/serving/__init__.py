@@ -0,0 +1,12 @@
+"""
+File Name:          __init__.py
+Project:            bcgraph
+
+File Description:
+
+"""
+from .featurization_service import FeaturizationService
+
+__all__ = [
+    'FeaturizationService',
+]
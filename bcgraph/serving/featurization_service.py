@@ -0,0 +1,526 @@
+"""
+File Name:          featurization_service.py
+Project:            bcgraph
+
+File Description:
+
+    Asyncio-based featurization service for online inference, which
+    collects concurrent SMILES requests into micro-batches, featurizes them
+    on a worker pool, and caches the resulting graphs of hot molecules.
+
+    The service could also be served over a local TCP or Unix socket, with
+    a line-based protocol: each request is a SMILES string terminated by a
+    newline, and each response (in the same order as requests) is a 4-byte
+    big-endian length followed by the torch.save serialization of either
+    the graph or the exception raised during featurization (including
+    requests that are not UTF-8 or over the line length limit).
+
+    The responses are pickles of arbitrary objects, which clients read with
+    torch.load(..., weights_only=False), and therefore the service should
+    only be served to trusted local clients.
+
+"""
+import time
+import asyncio
+import logging
+from io import BytesIO
+from functools import partial
+from importlib import import_module
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Set, Union
+
+import torch
+import numpy as np
+from rdkit import RDLogger
+from rdkit.Chem import AddHs, MolFromSmiles
+
+from bcgraph.utils import RDKitFeature, RDKitAtomFeatures, \
+    RDKitBondFeatures, convert_mol_to_generic_graph
+
+
+# suppress RDKit warnings and errors
+RDLogger.logger().setLevel(RDLogger.CRITICAL)
+
+_LOGGER = logging.getLogger(__name__)
+
+_DEFAULT_MAX_BATCH_SIZE = 64
+# maximum time (in seconds) that a request waits for its batch to fill up
+_DEFAULT_MAX_LATENCY = 0.005
+_DEFAULT_NUM_WORKERS = 4
+_DEFAULT_CACHE_SIZE = 65536
+_DEFAULT_MAX_QUEUE_SIZE = 4096
+_DEFAULT_NUM_LATENCIES = 100000
+_DEFAULT_PERCENTILES = (50., 90., 99.)
+_DEFAULT_HOST = '127.0.0.1'
+
+_Request: type = namedtuple(
+    '_Request',
+    [
+        'smiles',
+        'future',
+    ],
+)
+
+
+def _get_rdkit_feature_names(
+        rdkit_features: Sequence[Union[RDKitFeature, str]],
+        rdkit_feature_class: type,
+) -> List[str]:
+
+    # RDKit functions in the features cannot be pickled for the worker
+    # processes, so the features are passed by their names in the feature
+    # class (RDKitAtomFeatures or RDKitBondFeatures) instead
+    _names = {
+        _rdkit_feature: _name
+        for _name, _rdkit_feature in vars(rdkit_feature_class).items()
+        if isinstance(_rdkit_feature, RDKitFeature)
+    }
+
+    ret_names = []
+    for _rdkit_feature in rdkit_features:
+        if isinstance(_rdkit_feature, str):
+            _name = _rdkit_feature
+        else:
+            _name = _names.get(_rdkit_feature)
+        if not isinstance(getattr(rdkit_feature_class, str(_name), None),
+                          RDKitFeature):
+            _error_msg = f'Feature {_rdkit_feature} is not one of the ' \
+                         f'features in {rdkit_feature_class.__name__}.'
+            raise ValueError(_error_msg)
+        ret_names.append(_name)
+
+    return ret_names
+
+
+def _featurize_batch(
+        smiles_batch: Sequence[str],
+        atom_rdkit_feature_names: Sequence[str],
+        bond_rdkit_feature_names: Sequence[str],
+        one_hot_encoding: bool,
+        master_node: bool,
+        add_hs: bool,
+        backend: Optional[str],
+) -> List[Any]:
+
+    _atom_rdkit_features = [
+        getattr(RDKitAtomFeatures, _n) for _n in atom_rdkit_feature_names]
+    _bond_rdkit_features = [
+        getattr(RDKitBondFeatures, _n) for _n in bond_rdkit_feature_names]
+
+    # convert the generic graphs with the backend (bcgraph.dgl or
+    # bcgraph.pyg) if given, so that the graphs are ready for the models
+    _convert_generic_graph_to_graph = \
+        import_module(f'bcgraph.{backend}').convert_generic_graph_to_graph \
+        if backend else None
+
+    # return the exception in place of graph for each failed SMILES string
+    # so that one bad request does not fail the whole batch
+    ret_graphs = []
+    for _smiles in smiles_batch:
+        try:
+            _mol = MolFromSmiles(_smiles)
+            if _mol is None:
+                _error_msg = f'Cannot parse SMILES string {_smiles}.'
+                raise ValueError(_error_msg)
+            if add_hs:
+                _mol = AddHs(_mol)
+            _graph = convert_mol_to_generic_graph(
+                mol=_mol,
+                conformer=None,
+                atom_rdkit_features=_atom_rdkit_features,
+                bond_rdkit_features=_bond_rdkit_features,
+                one_hot_encoding=one_hot_encoding,
+                master_node=master_node,
+            )
+            if _convert_generic_graph_to_graph:
+                _graph = _convert_generic_graph_to_graph(_graph)
+            ret_graphs.append(_graph)
+        except Exception as e:
+            ret_graphs.append(e)
+
+    return ret_graphs
+
+
+class FeaturizationService:
+    """
+    usage:
+        async with FeaturizationService(...) as service:
+            graph = await service.featurize(smiles)
+
+    the features must be the ones in RDKitAtomFeatures/RDKitBondFeatures
+    (or their names), so that they can be passed to the worker processes.
+
+    the default executor is a process pool of num_workers processes,
+    because featurization is CPU-bound Python code that holds the GIL.
+    Any other executor (e.g. a thread pool) could be given instead.
+
+    note that the graphs are shared between requests of the same SMILES
+    string through the cache, and therefore should not be modified in place.
+
+    """
+    def __init__(
+            self,
+            atom_rdkit_features: Sequence[Union[RDKitFeature, str]],
+            bond_rdkit_features: Sequence[Union[RDKitFeature, str]],
+            one_hot_encoding: bool = True,
+            master_node: bool = True,
+            add_hs: bool = False,
+            backend: Optional[str] = None,
+            max_batch_size: Optional[int] = None,
+            max_latency: Optional[float] = None,
+            num_workers: Optional[int] = None,
+            cache_size: Optional[int] = None,
+            max_queue_size: Optional[int] = None,
+            executor: Optional[Executor] = None,
+    ):
+        if backend not in (None, 'dgl', 'pyg'):
+            _error_msg = f'Backend {backend} is not one of (\'dgl\', \'pyg\').'
+            raise ValueError(_error_msg)
+
+        self.max_batch_size = max_batch_size if max_batch_size \
+            else _DEFAULT_MAX_BATCH_SIZE
+        self.max_latency = max_latency if max_latency is not None \
+            else _DEFAULT_MAX_LATENCY
+        self.num_workers = num_workers if num_workers \
+            else _DEFAULT_NUM_WORKERS
+        self.cache_size = cache_size if cache_size is not None \
+            else _DEFAULT_CACHE_SIZE
+        self.max_queue_size = max_queue_size if max_queue_size \
+            else _DEFAULT_MAX_QUEUE_SIZE
+
+        # the partial of a module-level function with only picklable
+        # arguments (feature names instead of features) can be sent to
+        # worker processes
+        self._featurize_batch = partial(
+            _featurize_batch,
+            atom_rdkit_feature_names=_get_rdkit_feature_names(
+                atom_rdkit_features, RDKitAtomFeatures),
+            bond_rdkit_feature_names=_get_rdkit_feature_names(
+                bond_rdkit_features, RDKitBondFeatures),
+            one_hot_encoding=one_hot_encoding,
+            master_node=master_node,
+            add_hs=add_hs,
+            backend=backend,
+        )
+        # the executor is created on start if not given, so that the
+        # service could be restarted after the executor is shut down
+        self._own_executor = executor is None
+        self._executor: Optional[Executor] = executor
+
+        self._cache: OrderedDict = OrderedDict()
+        self._latencies: deque = deque(maxlen=_DEFAULT_NUM_LATENCIES)
+        self._running: bool = False
+        self._queue: Optional[asyncio.Queue] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._batcher: Optional[asyncio.Task] = None
+        # requests taken off the queue by the batcher but not dispatched
+        self._batch: List[_Request] = []
+        # batches dispatched to the executor but not finished
+        self._processing: Set[asyncio.Future] = set()
+
+    async def __aenter__(self) -> 'FeaturizationService':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+
+        # the queue is bounded so that the requests wait (backpressure)
+        # when all the workers are busy and the queue is full
+        if self._own_executor:
+            self._executor = ProcessPoolExecutor(max_workers=self.num_workers)
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._semaphore = asyncio.Semaphore(self.num_workers)
+        self._batch = []
+        self._processing = set()
+        self._running = True
+        self._batcher = asyncio.ensure_future(self._batch_requests())
+
+    async def stop(self) -> None:
+
+        self._running = False
+        if self._batcher:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+
+        # fail all the requests that are not dispatched yet, including the
+        # ones collected by the batcher and the ones still in the queue
+        # (which also wakes up the requests waiting on the full queue)
+        _batch, self._batch = self._batch, []
+        self._fail_requests(_batch)
+        if self._queue:
+            self._fail_queued_requests()
+
+        # finish the batches in flight before shutting down the executor
+        if self._processing:
+            await asyncio.gather(*self._processing, return_exceptions=True)
+        if self._own_executor and self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def featurize(
+            self,
+            smiles: str,
+    ) -> Any:
+
+        if not self._running:
+            _error_msg = f'Featurization service is not running.'
+            raise RuntimeError(_error_msg)
+
+        _start_time = time.perf_counter()
+        if smiles in self._cache:
+            self._cache.move_to_end(smiles)
+            _graph = self._cache[smiles]
+        else:
+            _future = asyncio.get_event_loop().create_future()
+            await self._queue.put(_Request(smiles=smiles, future=_future))
+            # the service could be stopped while waiting on the full queue,
+            # in which case nothing would take the request off the queue
+            if not self._running:
+                self._fail_queued_requests()
+            _graph = await _future
+
+        self._latencies.append(time.perf_counter() - _start_time)
+        return _graph
+
+    def latency_percentiles(
+            self,
+            percentiles: Sequence[float] = _DEFAULT_PERCENTILES,
+    ) -> Dict[float, float]:
+        """
+        percentiles of the latencies (in seconds) of the most recent
+        successful requests, including the ones served from the cache
+
+        """
+        if not self._latencies:
+            return {_p: float('nan') for _p in percentiles}
+
+        _latencies = np.percentile(np.array(self._latencies), percentiles)
+        return dict(zip(percentiles, _latencies.tolist()))
+
+    @staticmethod
+    def _fail_requests(
+            requests: Sequence[_Request],
+    ) -> None:
+
+        _request: _Request
+        for _request in requests:
+            if not _request.future.done():
+                _error_msg = f'Featurization service stopped before ' \
+                             f'processing SMILES string {_request.smiles}.'
+                _request.future.set_exception(RuntimeError(_error_msg))
+
+    def _fail_queued_requests(self) -> None:
+        while not self._queue.empty():
+            self._fail_requests([self._queue.get_nowait()])
+
+    async def _batch_requests(self) -> None:
+
+        _loop = asyncio.get_event_loop()
+        while True:
+
+            # wait for a free worker before collecting the next batch, so
+            # that the requests pile up in the (bounded) queue meanwhile
+            await self._semaphore.acquire()
+
+            # collect requests until either the batch is full or the first
+            # request in the batch has waited for max_latency
+            self._batch.append(await self._queue.get())
+            _deadline = _loop.time() + self.max_latency
+            while len(self._batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    self._batch.append(self._queue.get_nowait())
+                    continue
+                _timeout = _deadline - _loop.time()
+                if _timeout <= 0:
+                    break
+
+                _get = asyncio.ensure_future(self._queue.get())
+                try:
+                    await asyncio.wait({_get}, timeout=_timeout)
+                finally:
+                    # keep the request if it is already taken off the
+                    # queue, even if the batcher is cancelled meanwhile
+                    _taken = _get.done() and not _get.cancelled()
+                    if _taken:
+                        self._batch.append(_get.result())
+                    else:
+                        _get.cancel()
+                if not _taken:
+                    break
+
+            _batch, self._batch = self._batch, []
+            _processing = asyncio.ensure_future(self._process_batch(_batch))
+            self._processing.add(_processing)
+            _processing.add_done_callback(self._processing.discard)
+
+    async def _process_batch(
+            self,
+            batch: List[_Request],
+    ) -> None:
+
+        # featurize each unique SMILES string in the batch only once
+        _smiles_batch = list(OrderedDict.fromkeys(_r.smiles for _r in batch))
+        try:
+            _graphs = await asyncio.get_event_loop().run_in_executor(
+                self._executor, self._featurize_batch, _smiles_batch)
+        except Exception as e:
+            _graphs = [e] * len(_smiles_batch)
+        finally:
+            self._semaphore.release()
+        _graphs = dict(zip(_smiles_batch, _graphs))
+
+        for _smiles, _graph in _graphs.items():
+            if (not isinstance(_graph, Exception)) and (self.cache_size > 0):
+                self._cache[_smiles] = _graph
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        _request: _Request
+        for _request in batch:
+            if _request.future.done():
+                continue
+            _graph = _graphs[_request.smiles]
+            if isinstance(_graph, Exception):
+                _request.future.set_exception(_graph)
+            else:
+                _request.future.set_result(_graph)
+
+    async def serve(
+            self,
+            host: str = _DEFAULT_HOST,
+            port: Optional[int] = None,
+            path: Optional[str] = None,
+    ) -> asyncio.AbstractServer:
+        """
+        serve the featurization service on a Unix socket if path is given,
+        otherwise on a TCP socket of host (loopback by default) and port
+
+        """
+        if path:
+            return await asyncio.start_unix_server(
+                self._handle_connection, path=path)
+        else:
+            return await asyncio.start_server(
+                self._handle_connection, host=host, port=port)
+
+    async def _handle_connection(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter,
+    ) -> None:
+
+        # requests on the same connection are featurized concurrently, but
+        # responded in order, and the bounded queue stops reading requests
+        # when the responses cannot keep up
+        _responses = asyncio.Queue(maxsize=self.max_batch_size)
+        _responder = asyncio.ensure_future(
+            self._write_responses(_responses, writer))
+        try:
+            while not _responder.done():
+                try:
+                    _line = await self._read_line(reader)
+                    if not _line:
+                        # wait for the remaining responses to be written
+                        if await self._put_response(
+                                _responses, None, _responder):
+                            await asyncio.wait({_responder})
+                        break
+                    _response = asyncio.ensure_future(
+                        self.featurize(_line.decode().strip()))
+                except ValueError as e:
+                    # respond with the error for lines that are not UTF-8
+                    # or over the limit, and carry on with the next line
+                    _response = asyncio.get_event_loop().create_future()
+                    _response.set_exception(e)
+                if not await self._put_response(
+                        _responses, _response, _responder):
+                    _response.cancel()
+        except ConnectionError as e:
+            _debug_msg = f'Connection closed by the client: {e}.'
+            _LOGGER.debug(_debug_msg)
+        finally:
+            # if the client disconnects, the responder stops writing, and
+            # all the responses left in the queue are cancelled
+            _responder.cancel()
+            _cancelled = [_responder]
+            while not _responses.empty():
+                _response = _responses.get_nowait()
+                if _response:
+                    _response.cancel()
+                    _cancelled.append(_response)
+            await asyncio.gather(*_cancelled, return_exceptions=True)
+            writer.close()
+
+    @staticmethod
+    async def _read_line(
+            reader: asyncio.StreamReader,
+    ) -> bytes:
+
+        try:
+            return await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as e:
+            # the last line without newline, or empty at the end of stream
+            return e.partial
+        except asyncio.LimitOverrunError as e:
+            _consumed = e.consumed
+
+        # discard the rest of the line over the limit, so that the next
+        # line is read from its beginning
+        while True:
+            try:
+                await reader.readexactly(_consumed)
+                await reader.readuntil(b'\n')
+                break
+            except asyncio.LimitOverrunError as e:
+                _consumed = e.consumed
+            except asyncio.IncompleteReadError:
+                break
+
+        _error_msg = f'Request line is over the limit of the stream reader.'
+        raise ValueError(_error_msg)
+
+    @staticmethod
+    async def _put_response(
+            responses: asyncio.Queue,
+            response: Optional[asyncio.Future],
+            responder: asyncio.Future,
+    ) -> bool:
+
+        # put the response in the queue unless the responder stops, in
+        # which case nothing would take it off the (possibly full) queue
+        _put = asyncio.ensure_future(responses.put(response))
+        await asyncio.wait(
+            {_put, responder}, return_when=asyncio.FIRST_COMPLETED)
+        if not _put.done():
+            _put.cancel()
+            return False
+        return True
+
+    @staticmethod
+    async def _write_responses(
+            responses: asyncio.Queue,
+            writer: asyncio.StreamWriter,
+    ) -> None:
+
+        while True:
+            _response = await responses.get()
+            if _response is None:
+                break
+            try:
+                _payload = await _response
+            except Exception as e:
+                _payload = e
+
+            _buffer = BytesIO()
+            torch.save(_payload, _buffer)
+            _bytes = _buffer.getvalue()
+            writer.write(len(_bytes).to_bytes(4, 'big') + _bytes)
+            await writer.drain()
@@ -7,7 +7,8 @@ File Description:
 """
 from .encoding import one_hot_encode
 from .mol import RDKitFeature, RDKitAtomFeatures, RDKitBondFeatures, \
-    check_conformer, convert_mol_to_generic_graph
+    ConformerValidator, get_default_conformer_validator, check_conformer, \
+    convert_mol_to_generic_graph
 
 
 __all__ = [
@@ -17,6 +18,8 @@ __all__ = [
     'RDKitFeature',
     'RDKitAtomFeatures',
     'RDKitBondFeatures',
+    'ConformerValidator',
+    'get_default_conformer_validator',
     'check_conformer',
     'convert_mol_to_generic_graph',
 ]
@@ -7,7 +7,7 @@ File Description:
 """
 import logging
 from dataclasses import dataclass
-from collections import namedtuple
+from collections import namedtuple, Counter
 from typing import Optional, Sequence, Union, Dict
 
 import torch
@@ -209,25 +209,110 @@ class RDKitBondFeatures:
     )
 
 
+_CONFORMER_CHECK_POLICIES = ('warn', 'drop', 'raise')
+_UNUSABLE_CONFORMER_CHECKS = ('num_atoms_mismatch', 'non_finite')
+
+
+class ConformerValidator:
+    """
+    validate conformers with the following checks (as the names of the
+    counters for failed checks):
+    - num_atoms_mismatch: the molecule and conformer are not of the same
+      size
+    - non_finite: some coordinates are NaN or inf
+    - no_z_coordinates: the conformer is actually 2D (useless Z coordinate
+      in graph)
+    - zero_coordinates: some atoms have all-zero coordinates, which implies
+      bad conformer
+
+    the policy for failed checks is one of
+    - warn: count and keep the positions, except for the unusable ones
+      failing num_atoms_mismatch or non_finite, which raise ValueError
+    - drop: count and drop the positions (same as no conformer)
+    - raise: raise ValueError
+
+    only the first failure of each check is logged as a warning, and the
+    rest are aggregated in the counters (see log_summary).
+
+    """
+    def __init__(
+            self,
+            policy: str = 'warn',
+    ):
+        if policy not in _CONFORMER_CHECK_POLICIES:
+            _error_msg = f'Conformer check policy {policy} is not one of ' \
+                         f'{_CONFORMER_CHECK_POLICIES}.'
+            raise ValueError(_error_msg)
+
+        self.policy = policy
+        self.counters: Counter = Counter()
+
+    def validate(
+            self,
+            mol: Mol,
+            conformer: Conformer,
+    ) -> Optional[np.array]:
+
+        # extract the positions from RDKit only once, and perform each
+        # check as a single reduction over all the coordinates
+        _positions: np.array = conformer.GetPositions().reshape(-1, 3)
+        _failed_checks = []
+        if len(_positions) != mol.GetNumAtoms():
+            _failed_checks.append('num_atoms_mismatch')
+        if not np.isfinite(_positions).all():
+            _failed_checks.append('non_finite')
+        if not _positions[:, 2].any():
+            _failed_checks.append('no_z_coordinates')
+        if not _positions.any(axis=1).all():
+            _failed_checks.append('zero_coordinates')
+
+        self.counters['num_conformers'] += 1
+        if not _failed_checks:
+            return _positions
+        self.counters.update(_failed_checks)
+
+        _msg = f'Conformer failed check(s) {_failed_checks}.'
+        if self.policy == 'raise' or (self.policy == 'warn' and set(
+                _failed_checks) & set(_UNUSABLE_CONFORMER_CHECKS)):
+            raise ValueError(_msg)
+        for _check in _failed_checks:
+            if self.counters[_check] == 1:
+                _warning_msg = \
+                    f'{_msg} Following failures of check {_check} ' \
+                    f'are only counted (policy: {self.policy}).'
+                _LOGGER.warning(_warning_msg)
+
+        if self.policy == 'drop':
+            self.counters['num_dropped'] += 1
+            return None
+        return _positions
+
+    def log_summary(self) -> None:
+        _info_msg = f'Conformer validation counters: {dict(self.counters)}.'
+        _LOGGER.info(_info_msg)
+
+
+_DEFAULT_CONFORMER_VALIDATOR = ConformerValidator()
+
+
+def get_default_conformer_validator() -> ConformerValidator:
+    # the validator (and its counters) used by the converters when no
+    # validator is given, e.g. for logging the summary of all conversions
+    return _DEFAULT_CONFORMER_VALIDATOR
+
+
 def check_conformer(
         mol: Mol,
         conformer: Conformer,
 ) -> bool:
 
-    # throw warnings if
-    # - the conformer is actually 2D (useless Z coordinate in graph)
-    # - some atoms have all-zero coordinates, which implies bad conformer
-    _positions: np.array = conformer.GetPositions()
-    if not _positions[:, 2].any():
-        _warning_msg = f'Conformer has no Z coordinates. Continuing ...'
-        _LOGGER.warning(_warning_msg)
-    if not np.array([_p.any() for _p in _positions]).all():
-        _warning_msg = f'Conformer has atom(s) with invalid coordinates ' \
-                       f'(0.0, 0.0, 0.0). Continuing ...'
-        _LOGGER.warning(_warning_msg)
-
-    # make sure that the molecule and conformer are of the same size
-    return len(mol.GetAtoms()) == len(mol.GetConformer().GetPositions())
+    # whether the conformer positions are usable, with the failed checks
+    # aggregated in the default validator
+    try:
+        return _DEFAULT_CONFORMER_VALIDATOR.validate(mol, conformer) \
+            is not None
+    except ValueError:
+        return False
 
 
 def convert_mol_to_generic_graph(
@@ -237,21 +322,29 @@ def convert_mol_to_generic_graph(
         bond_rdkit_features: Sequence[RDKitFeature],
         one_hot_encoding: bool = True,
         master_node: bool = True,
+        conformer_validator: Optional[ConformerValidator] = None,
 ) -> Dict[str, torch.Tensor]:
     """
     decisions to make before calling this function:
     - include/exclude hydrogen atoms using AddHs/RemoveHs with:
         _mol: Mol = AddHs(mol) if include_Hs else RemoveHs(mol)
     - get the conformer if the atom positions are part of the atom features
+    - validate the conformer with a ConformerValidator of specific policy
+      and counters, otherwise the default one (policy: warn, see
+      get_default_conformer_validator) is used, which fails on conformers
+      with mismatched number of atoms or NaN/inf coordinates; use a
+      validator of policy drop to replace their positions with zeros
 
     """
 
-    # get the positions of atoms if conformer is given
+    # get the positions of atoms if conformer is given and not dropped
+    node_pos: Optional[np.array] = None
     if conformer:
-        assert check_conformer(mol, conformer)
-        node_pos: np.array = conformer.GetPositions()
-    else:
-        node_pos: np.array = np.zeros(shape=(len(mol.GetAtoms()), 3))
+        _conformer_validator = conformer_validator \
+            if conformer_validator else _DEFAULT_CONFORMER_VALIDATOR
+        node_pos = _conformer_validator.validate(mol, conformer)
+    if node_pos is None:
+        node_pos = np.zeros(shape=(mol.GetNumAtoms(), 3))
 
     # overall graph node attributes/features
     node_attr = []
@@ -0,0 +1,108 @@
+"""
+File Name:          test_conformer_validator.py
+Project:            bcgraph
+
+File Description:
+
+"""
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('torch')
+pytest.importorskip('rdkit')
+pytest.importorskip('dgl')
+pytest.importorskip('torch_geometric')
+
+from rdkit.Chem import Conformer, MolFromSmiles  # noqa: E402
+from rdkit.Geometry import Point3D  # noqa: E402
+
+from bcgraph.utils import ConformerValidator, RDKitAtomFeatures, \
+    RDKitBondFeatures, convert_mol_to_generic_graph, \
+    get_default_conformer_validator  # noqa: E402
+
+
+MOL = MolFromSmiles('CCO')
+POSITIONS = {
+    'valid': [(0., 0., 1.), (1.5, 0., 1.), (2., 1.4, 1.)],
+    'no_z_coordinates': [(1., 0., 0.), (1.5, 0., 0.), (2., 1.4, 0.)],
+    'zero_coordinates': [(0., 0., 0.), (1.5, 0., 1.), (2., 1.4, 1.)],
+    'non_finite': [(0., 0., 1.), (np.nan, 0., 1.), (2., np.inf, 1.)],
+    'num_atoms_mismatch': [(0., 0., 1.), (1.5, 0., 1.)],
+}
+
+
+def _get_conformer(positions):
+    _conformer = Conformer(len(positions))
+    for _i, _p in enumerate(positions):
+        _conformer.SetAtomPosition(_i, Point3D(*_p))
+    return _conformer
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        ConformerValidator(policy='ignore')
+
+
+def test_valid_conformer():
+    for _policy in ('warn', 'drop', 'raise'):
+        _validator = ConformerValidator(policy=_policy)
+        _positions = _validator.validate(
+            MOL, _get_conformer(POSITIONS['valid']))
+        assert np.array_equal(_positions, np.array(POSITIONS['valid']))
+        assert dict(_validator.counters) == {'num_conformers': 1}
+
+
+@pytest.mark.parametrize('check', [
+    'no_z_coordinates',
+    'zero_coordinates',
+    'non_finite',
+    'num_atoms_mismatch',
+])
+def test_policies(check):
+    _conformer = _get_conformer(POSITIONS[check])
+    _unusable = check in ('non_finite', 'num_atoms_mismatch')
+
+    # unusable positions are fatal unless explicitly dropped
+    _validator = ConformerValidator(policy='warn')
+    for _ in range(3):
+        if _unusable:
+            with pytest.raises(ValueError):
+                _validator.validate(MOL, _conformer)
+        else:
+            assert _validator.validate(MOL, _conformer) is not None
+    assert _validator.counters['num_conformers'] == 3
+    assert _validator.counters[check] == 3
+    assert _validator.counters['num_dropped'] == 0
+
+    _validator = ConformerValidator(policy='drop')
+    assert _validator.validate(MOL, _conformer) is None
+    assert _validator.counters[check] == 1
+    assert _validator.counters['num_dropped'] == 1
+
+    _validator = ConformerValidator(policy='raise')
+    with pytest.raises(ValueError):
+        _validator.validate(MOL, _conformer)
+    assert _validator.counters[check] == 1
+    assert _validator.counters['num_dropped'] == 0
+
+
+def test_default_validator():
+    _validator = get_default_conformer_validator()
+    _num_non_finite = _validator.counters['non_finite']
+    _kwargs = dict(
+        mol=MOL,
+        conformer=_get_conformer(POSITIONS['non_finite']),
+        atom_rdkit_features=[RDKitAtomFeatures.atomic_number],
+        bond_rdkit_features=[RDKitBondFeatures.bond_type],
+        master_node=False,
+    )
+    with pytest.raises(ValueError):
+        convert_mol_to_generic_graph(**_kwargs)
+    assert _validator.counters['non_finite'] == _num_non_finite + 1
+
+    # dropping the positions to zeros is opt-in
+    _drop_validator = ConformerValidator(policy='drop')
+    _graph = convert_mol_to_generic_graph(
+        conformer_validator=_drop_validator, **_kwargs)
+    assert (_graph['node_pos'] == 0.).all()
+    assert _drop_validator.counters['num_dropped'] == 1
@@ -0,0 +1,226 @@
+"""
+File Name:          test_featurization_service.py
+Project:            bcgraph
+
+File Description:
+
+"""
+import asyncio
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('rdkit')
+pytest.importorskip('dgl')
+pytest.importorskip('torch_geometric')
+
+from rdkit.Chem import MolFromSmiles  # noqa: E402
+
+from bcgraph.utils import RDKitAtomFeatures, RDKitBondFeatures, \
+    convert_mol_to_generic_graph  # noqa: E402
+from bcgraph.serving import FeaturizationService  # noqa: E402
+
+
+ATOM_RDKIT_FEATURES = [
+    RDKitAtomFeatures.atomic_number,
+    RDKitAtomFeatures.hybridization,
+]
+BOND_RDKIT_FEATURES = [
+    RDKitBondFeatures.bond_type,
+]
+
+
+def _get_service(batch_sizes=None, event=None, **kwargs):
+    # a thread pool is used to record the featurized batches
+    _service = FeaturizationService(
+        atom_rdkit_features=ATOM_RDKIT_FEATURES,
+        bond_rdkit_features=BOND_RDKIT_FEATURES,
+        executor=ThreadPoolExecutor(max_workers=1),
+        **kwargs,
+    )
+    _featurize_batch = _service._featurize_batch
+
+    def _record_featurize_batch(smiles_batch):
+        if batch_sizes is not None:
+            batch_sizes.append(len(smiles_batch))
+        if event is not None:
+            event.wait()
+        return _featurize_batch(smiles_batch)
+
+    _service._featurize_batch = _record_featurize_batch
+    return _service
+
+
+def test_process_pool():
+
+    async def _test():
+        async with FeaturizationService(
+                atom_rdkit_features=ATOM_RDKIT_FEATURES,
+                bond_rdkit_features=BOND_RDKIT_FEATURES,
+                num_workers=2,
+        ) as _service:
+            return await _service.featurize('c1ccccc1O')
+
+    _graph = asyncio.run(_test())
+    _expected_graph = convert_mol_to_generic_graph(
+        mol=MolFromSmiles('c1ccccc1O'),
+        conformer=None,
+        atom_rdkit_features=ATOM_RDKIT_FEATURES,
+        bond_rdkit_features=BOND_RDKIT_FEATURES,
+    )
+    for _key in _expected_graph:
+        assert torch.equal(_graph[_key], _expected_graph[_key])
+
+
+def test_deadline_flush():
+    _batch_sizes = []
+
+    async def _test():
+        async with _get_service(
+                batch_sizes=_batch_sizes,
+                max_batch_size=64,
+                max_latency=0.05,
+        ) as _service:
+            return await asyncio.wait_for(asyncio.gather(
+                *[_service.featurize(_s) for _s in ('C', 'CC', 'CCO')]), 5)
+
+    _graphs = asyncio.run(_test())
+    assert len(_graphs) == 3
+    # a partial batch is flushed at the deadline instead of waiting to fill
+    assert _batch_sizes == [3]
+
+
+def test_cache_hit():
+    _batch_sizes = []
+
+    async def _test():
+        async with _get_service(batch_sizes=_batch_sizes) as _service:
+            _graph = await _service.featurize('CCO')
+            _cached_graph = await _service.featurize('CCO')
+            with pytest.raises(ValueError):
+                await _service.featurize('not a SMILES string')
+            return _graph, _cached_graph, _service.latency_percentiles()
+
+    _graph, _cached_graph, _latency_percentiles = asyncio.run(_test())
+    assert _cached_graph is _graph
+    assert _batch_sizes == [1, 1]
+    assert set(_latency_percentiles) == {50., 90., 99.}
+
+
+def test_stop_with_pending_requests():
+
+    async def _test():
+        # requests held by the batcher waiting for the deadline
+        _service = _get_service(max_latency=60.)
+        await _service.start()
+        _requests = [asyncio.ensure_future(_service.featurize(_s))
+                     for _s in ('C', 'CC', 'CCO')]
+        await asyncio.sleep(0.1)
+        await _service.stop()
+        _held = await asyncio.wait_for(
+            asyncio.gather(*_requests, return_exceptions=True), 5)
+
+        # one batch in flight, and the rest in or waiting on the full queue
+        _event = threading.Event()
+        _service = _get_service(
+            event=_event,
+            max_batch_size=1,
+            max_latency=0.,
+            num_workers=1,
+            max_queue_size=2,
+        )
+        await _service.start()
+        _requests = [asyncio.ensure_future(_service.featurize('C' * _i))
+                     for _i in range(1, 9)]
+        await asyncio.sleep(0.1)
+        asyncio.get_event_loop().call_later(0.1, _event.set)
+        await asyncio.wait_for(_service.stop(), 5)
+        _queued = await asyncio.wait_for(
+            asyncio.gather(*_requests, return_exceptions=True), 5)
+
+        with pytest.raises(RuntimeError):
+            await _service.featurize('C')
+        return _held, _queued
+
+    _held, _queued = asyncio.run(_test())
+    assert all(isinstance(_r, RuntimeError) for _r in _held)
+    assert isinstance(_queued[0], dict)
+    assert all(isinstance(_r, RuntimeError) for _r in _queued[1:])
+
+
+def test_restart_and_stop_without_start():
+
+    async def _test():
+        _service = FeaturizationService(
+            atom_rdkit_features=ATOM_RDKIT_FEATURES,
+            bond_rdkit_features=BOND_RDKIT_FEATURES,
+            num_workers=1,
+        )
+        await _service.stop()
+        _graphs = []
+        for _smiles in ('C', 'CC'):
+            async with _service:
+                _graphs.append(await _service.featurize(_smiles))
+        return _graphs
+
+    _graphs = asyncio.run(_test())
+    assert [len(_g['node_attr']) for _g in _graphs] == [2, 3]
+
+
+async def _read_response(reader):
+    _num_bytes = int.from_bytes(await reader.readexactly(4), 'big')
+    _buffer = BytesIO(await reader.readexactly(_num_bytes))
+    try:
+        return torch.load(_buffer, weights_only=False)
+    except TypeError:
+        # torch versions without weights_only
+        _buffer.seek(0)
+        return torch.load(_buffer)
+
+
+def test_serve():
+
+    async def _test():
+        async with _get_service(max_latency=0.01) as _service:
+            _server = await _service.serve(port=0)
+            _host, _port = _server.sockets[0].getsockname()[:2]
+            assert _host == '127.0.0.1'
+
+            # responses are in the order of requests, including the errors
+            # for bad SMILES, non-UTF-8 and over-limit lines
+            _reader, _writer = await asyncio.open_connection(_host, _port)
+            _writer.write(
+                b'CCO\nnot a SMILES string\n\xff\xfe\n' +
+                b'C' * 100000 + b'\nc1ccccc1\n')
+            await _writer.drain()
+            _responses = [await asyncio.wait_for(_read_response(_reader), 5)
+                          for _ in range(5)]
+            _writer.close()
+
+            # closing the client mid-stream leaves no pending tasks
+            _tasks = asyncio.all_tasks()
+            _reader, _writer = await asyncio.open_connection(_host, _port)
+            _writer.write(b''.join(
+                f'{"C" * (_i % 50 + 1)}\n'.encode() for _i in range(500)))
+            await _writer.drain()
+            _writer.close()
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                _pending_tasks = asyncio.all_tasks() - _tasks
+                if not _pending_tasks:
+                    break
+
+            _server.close()
+            await _server.wait_closed()
+            return _responses, _pending_tasks
+
+    _responses, _pending_tasks = asyncio.run(_test())
+    assert len(_responses[0]['node_attr']) == 4
+    assert isinstance(_responses[1], ValueError)
+    assert isinstance(_responses[2], UnicodeDecodeError)
+    assert isinstance(_responses[3], ValueError)
+    assert len(_responses[4]['node_attr']) == 7
+    assert not _pending_tasks
@@ -0,0 +1,223 @@
+"""
+File Name:          test_generate_mol_graph.py
+Project:            bcgraph
+
+File Description:
+
+"""
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('rdkit')
+pytest.importorskip('dgl')
+pytest.importorskip('torch_geometric')
+
+from rdkit.Chem import MolFromSmiles  # noqa: E402
+
+from bcgraph.utils import RDKitAtomFeatures, RDKitBondFeatures, \
+    convert_mol_to_generic_graph  # noqa: E402
+from bcgraph.faker import generate_generic_mol_graph_batch, \
+    generate_generic_mol_graphs  # noqa: E402
+
+
+# numeric/binary bond features are left out because they are not yet
+# supported by convert_mol_to_generic_graph
+ATOM_RDKIT_FEATURES = [
+    RDKitAtomFeatures.atomic_number,
+    RDKitAtomFeatures.hybridization,
+    RDKitAtomFeatures.is_aromatic,
+    RDKitAtomFeatures.mass,
+]
+BOND_RDKIT_FEATURES = [
+    RDKitBondFeatures.bond_type,
+    RDKitBondFeatures.stereo,
+]
+
+
+def _generate(**kwargs):
+    _kwargs = dict(
+        num_graphs=64,
+        atom_rdkit_features=ATOM_RDKIT_FEATURES,
+        bond_rdkit_features=BOND_RDKIT_FEATURES,
+        positions=True,
+        seed=0,
+    )
+    _kwargs.update(kwargs)
+    return generate_generic_mol_graphs(**_kwargs)
+
+
+def test_seeded_reproducibility():
+    _graphs, _same_graphs = _generate(seed=0), _generate(seed=0)
+    for _graph, _same_graph in zip(_graphs, _same_graphs):
+        for _key in _graph:
+            assert torch.equal(_graph[_key], _same_graph[_key])
+
+    _other_graphs = _generate(seed=1)
+    assert not torch.equal(
+        torch.cat([_g['node_pos'] for _g in _graphs]),
+        torch.cat([_g['node_pos'] for _g in _other_graphs]),
+    )
+
+
+@pytest.mark.parametrize('max_degree', [2, 3, 4])
+def test_max_degree(max_degree):
+    _graphs = _generate(
+        master_node=False, max_degree=max_degree, num_rings=(2, 4))
+    for _graph in _graphs:
+        _num_atoms = len(_graph['node_attr'])
+        _edge_index = _graph['edge_index']
+        _degree = torch.bincount(
+            _edge_index.flatten(), minlength=_num_atoms)
+        assert int(_degree.max()) <= max_degree
+        # connected (spanning tree) without self-loops or duplicate bonds
+        assert len(_edge_index) >= _num_atoms - 1
+        assert (_edge_index[:, 0] != _edge_index[:, 1]).all()
+        _bonds = {tuple(sorted(_e)) for _e in _edge_index.tolist()}
+        assert len(_bonds) == len(_edge_index)
+
+
+@pytest.mark.parametrize('one_hot_encoding', [True, False])
+@pytest.mark.parametrize('master_node', [True, False])
+def test_attr_dims(one_hot_encoding, master_node):
+    _graph = convert_mol_to_generic_graph(
+        mol=MolFromSmiles('c1ccccc1O'),
+        conformer=None,
+        atom_rdkit_features=ATOM_RDKIT_FEATURES,
+        bond_rdkit_features=BOND_RDKIT_FEATURES,
+        one_hot_encoding=one_hot_encoding,
+        master_node=master_node,
+    )
+    _fake_graph = _generate(
+        one_hot_encoding=one_hot_encoding, master_node=master_node)[0]
+
+    for _key in _graph:
+        assert _graph[_key].shape[1:] == _fake_graph[_key].shape[1:]
+    if master_node:
+        assert _fake_graph['node_attr'][-1, -1] == 1.
+        assert (_fake_graph['node_attr'][:-1, -1] == 0.).all()
+
+
+def test_batch_matches_graphs():
+    _graph_batch = generate_generic_mol_graph_batch(
+        num_graphs=16,
+        atom_rdkit_features=ATOM_RDKIT_FEATURES,
+        bond_rdkit_features=BOND_RDKIT_FEATURES,
+        positions=True,
+        seed=0,
+    )
+    _graphs = _generate(num_graphs=16)
+
+    assert len(_graph_batch['num_nodes']) == len(_graphs)
+    assert torch.equal(
+        _graph_batch['node_attr'],
+        torch.cat([_g['node_attr'] for _g in _graphs]))
+    _node_offset = 0
+    _edge_index = []
+    for _graph in _graphs:
+        _edge_index.append(_graph['edge_index'] + _node_offset)
+        _node_offset += len(_graph['node_attr'])
+    assert torch.equal(_graph_batch['edge_index'], torch.cat(_edge_index))
+
+
+def test_ring_sizes_without_rings():
+    _graphs = _generate(num_rings=0, ring_sizes=())
+    assert len(_graphs) == 64
+    with pytest.raises(ValueError):
+        _generate(num_rings=1, ring_sizes=())
+
+
+@pytest.mark.parametrize('batched', [True, False])
+def test_no_graphs(batched):
+    from bcgraph import dgl, pyg
+    for _backend in (dgl, pyg):
+        with pytest.raises(ValueError):
+            _backend.generate_mol_graphs(
+                num_graphs=0,
+                atom_rdkit_features=ATOM_RDKIT_FEATURES,
+                bond_rdkit_features=BOND_RDKIT_FEATURES,
+                batched=batched,
+            )
+    with pytest.raises(ValueError):
+        _generate(num_graphs=0)
+
+
+def _check_undirected_edges(edge_index, edge_attr, graph):
+    # each edge of the generic graph is followed by its reverse, with the
+    # same attributes
+    assert torch.equal(edge_index[:, 0::2], graph['edge_index'].t())
+    assert torch.equal(edge_index[:, 1::2], graph['edge_index'].t().flip(0))
+    assert torch.equal(edge_attr[0::2], graph['edge_attr'])
+    assert torch.equal(edge_attr[1::2], graph['edge_attr'])
+
+
+def test_pyg_batch_matches_graphs():
+    from bcgraph import pyg
+
+    _kwargs = dict(
+        num_graphs=16,
+        atom_rdkit_features=ATOM_RDKIT_FEATURES,
+        bond_rdkit_features=BOND_RDKIT_FEATURES,
+        positions=True,
+        seed=0,
+    )
+    _batch = pyg.generate_mol_graphs(batched=True, **_kwargs)
+    _graphs = pyg.generate_mol_graphs(batched=False, **_kwargs)
+    _generic_graphs = _generate(num_graphs=16)
+
+    _num_nodes = torch.LongTensor([_g.num_nodes for _g in _graphs])
+    assert torch.equal(
+        _batch.ptr, torch.cat([torch.zeros(1).long(), _num_nodes.cumsum(0)]))
+    assert torch.equal(
+        _batch.batch, torch.arange(16).repeat_interleave(_num_nodes))
+
+    _edge_offset = 0
+    for _i, (_graph, _generic_graph) in enumerate(
+            zip(_graphs, _generic_graphs)):
+        _node_slice = slice(int(_batch.ptr[_i]), int(_batch.ptr[_i + 1]))
+        _edge_slice = slice(_edge_offset, _edge_offset + _graph.num_edges)
+        _edge_offset += _graph.num_edges
+
+        assert torch.equal(_batch.x[_node_slice], _graph.x)
+        assert torch.equal(_batch.pos[_node_slice], _graph.pos)
+        assert torch.equal(
+            _batch.edge_index[:, _edge_slice] - _batch.ptr[_i],
+            _graph.edge_index)
+        assert torch.equal(_batch.edge_attr[_edge_slice], _graph.edge_attr)
+        _check_undirected_edges(
+            _graph.edge_index, _graph.edge_attr, _generic_graph)
+    assert _edge_offset == _batch.edge_index.shape[1]
+
+
+def test_dgl_batch_matches_graphs():
+    import dgl
+    from bcgraph.dgl import generate_mol_graphs
+
+    _kwargs = dict(
+        num_graphs=16,
+        atom_rdkit_features=ATOM_RDKIT_FEATURES,
+        bond_rdkit_features=BOND_RDKIT_FEATURES,
+        positions=True,
+        seed=0,
+    )
+    _batch = generate_mol_graphs(batched=True, **_kwargs)
+    _graphs = generate_mol_graphs(batched=False, **_kwargs)
+    _generic_graphs = _generate(num_graphs=16)
+
+    assert torch.equal(
+        _batch.batch_num_nodes(),
+        torch.LongTensor([_g.num_nodes() for _g in _graphs]))
+    assert torch.equal(
+        _batch.batch_num_edges(),
+        torch.LongTensor([_g.num_edges() for _g in _graphs]))
+
+    for _unbatched_graph, _graph, _generic_graph in zip(
+            dgl.unbatch(_batch), _graphs, _generic_graphs):
+        for _key in ('attr', 'pos'):
+            assert torch.equal(
+                _unbatched_graph.ndata[_key], _graph.ndata[_key])
+        assert torch.equal(
+            _unbatched_graph.edata['attr'], _graph.edata['attr'])
+        _edge_index = torch.stack(_graph.edges())
+        assert torch.equal(torch.stack(_unbatched_graph.edges()), _edge_index)
+        _check_undirected_edges(
+            _edge_index, _graph.edata['attr'], _generic_graph)